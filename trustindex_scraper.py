@@ -3,55 +3,65 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, StaleElementReferenceException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 import json
 import csv
-from openpyxl import Workbook # Make sure openpyxl is installed: pip install openpyxl
+import xlsxwriter # Make sure XlsxWriter is installed: pip install XlsxWriter
 import time
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from itertools import chain
+
+@dataclass(slots=True)
+class Review:
+    """One scraped review. Slots keep thousands of records small and cheap to build."""
+    review_id: str
+    author: str | None
+    date: str | None
+    rating: int | None
+    body: str | None
+    source_platform: str
+
+# Output column order, taken from the Review fields so the two can't drift apart
+FIELDNAMES = tuple(f.name for f in fields(Review))
+# Builds a row tuple straight from the slots; astuple() would deep-copy every field
+review_row = attrgetter(*FIELDNAMES)
+
+# Images, fonts and trackers aren't needed for the review text, so Chrome is told not to fetch them.
+# CSS still loads, otherwise the 'More' button may not count as clickable.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.webp", "*.gif", "*.svg",
+    "*.woff*", "*.ttf", "*.otf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*facebook*",
+]
+
+# Extracts the review fields in the browser and returns them as a list of dicts in one round trip,
+# skipping the first arguments[0] reviews that were already extracted.
+EXTRACT_REVIEWS_JS = r"""
+return Array.from(document.querySelectorAll('div.review')).slice(arguments[0]).map(function (el) {
+    var text = function (selector) {
+        var node = el.querySelector(selector);
+        return node ? node.innerText.trim() : null; // innerText already turns <br> into newlines
+    };
+    var stars = el.querySelector('div.ti-stars');
+    var source = el.className.match(/(?:^|\s)source-(\S+)/);
+    return {
+        review_id: el.dataset.id || null, // Unique review ID for deduplication
+        author: text('div.ti-name'),
+        date: text('div.ti-date'),
+        rating: stars ? stars.querySelectorAll('span.ti-star.f').length : null, // Filled stars
+        body: text('div.ti-review-content'),
+        source_platform: source ? source[1] : 'Unknown'
+    };
+});
+"""
 
-def parse_review_div(review_div):
-    """Helper function to parse a single review div element."""
-    try:
-        author = review_div.find('div', class_='ti-name').text.strip()
-    except AttributeError:
-        author = None
-    try:
-        date = review_div.find('div', class_='ti-date').text.strip()
-    except AttributeError:
-        date = None
-    try:
-        # Count the number of 'ti-star f' (filled) stars
-        rating = len(review_div.find('div', class_='ti-stars').find_all('span', class_='ti-star f'))
-    except AttributeError:
-        rating = None
-    try:
-        # Extract text, handling potential <br> tags for line breaks
-        content_div = review_div.find('div', class_='ti-review-content')
-        # Replace <br> with newline, then get text and strip whitespace
-        for br in content_div.find_all('br'):
-            br.replace_with('\n')
-        body = content_div.text.strip()
-    except AttributeError:
-        body = None
-    try:
-        # Attempt to get source from the platform icon class if available, fallback needed
-        source_class = review_div['class'] # Get all classes of the review div
-        source = next((s.replace('source-', '') for s in source_class if s.startswith('source-')), 'Unknown')
-    except (AttributeError, KeyError):
-         source = 'Unknown' # Fallback if no source class found
-
-    # Get the unique review ID for deduplication
-    review_id = review_div.get('data-id')
+# Counting in the page returns one number instead of a WebElement reference per review
+COUNT_REVIEWS_JS = "return document.querySelectorAll('div.review').length;"
 
-    return {
-        'review_id': review_id, # Add review_id for deduplication
-        'author': author,
-        'date': date,
-        'rating': rating,
-        'body': body,
-        'source_platform': source
-    }
+def get_new_reviews(driver, prev_count=0):
+    """Extracts the reviews appended after the first prev_count review divs, directly in the browser."""
+    return [Review(**review_data) for review_data in driver.execute_script(EXTRACT_REVIEWS_JS, prev_count) or []]
 
 
 def extract_reviews_selenium(url, max_loops=10):
@@ -63,11 +73,10 @@ def extract_reviews_selenium(url, max_loops=10):
         url (str): The URL of the Trustindex.io page.
         max_loops (int): The maximum number of "More" button clicks.
 
-    Returns:
-        list: A list of review dictionaries (or an empty list on failure).
+    Yields:
+        Review: Each unique review as soon as it is extracted, so callers can stream it to disk.
     """
     extracted_review_ids = set() # Keep track of extracted review IDs to avoid duplicates
-    all_reviews_data = []
 
     try:
         # Configure Chrome options
@@ -81,25 +90,29 @@ def extract_reviews_selenium(url, max_loops=10):
         chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
 
         driver = webdriver.Chrome(options=chrome_options)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except WebDriverException as e:
+            print(f"Could not block images/fonts/trackers, loading everything: {e}")
         driver.get(url)
         print("Page loaded.")
 
         # Initial extraction from the first page load
         print("Extracting initial reviews...")
-        initial_soup = BeautifulSoup(driver.page_source, 'html.parser')
-        review_divs = initial_soup.find_all('div', class_='review') # Find review containers
-        for div in review_divs:
-            review_data = parse_review_div(div)
-            if review_data and review_data['review_id'] and review_data['review_id'] not in extracted_review_ids:
-                all_reviews_data.append(review_data)
-                extracted_review_ids.add(review_data['review_id'])
-        print(f"Extracted {len(all_reviews_data)} initial reviews.")
+        for review in get_new_reviews(driver):
+            if review.review_id and review.review_id not in extracted_review_ids:
+                extracted_review_ids.add(review.review_id)
+                yield review
+        print(f"Extracted {len(extracted_review_ids)} initial reviews.")
 
 
         loop_count = 0
         while loop_count < max_loops:
             try:
                 print(f"\nAttempting loop {loop_count + 1}/{max_loops}")
+                # Remember how many reviews are already in the DOM so only the new ones get parsed
+                prev_count = driver.execute_script(COUNT_REVIEWS_JS)
                 # Use a more specific CSS selector and wait for clickability
                 more_button_locator = (By.CSS_SELECTOR, '#next-button > a.page-link')
                 more_button = WebDriverWait(driver, 15).until(
@@ -116,7 +129,6 @@ def extract_reviews_selenium(url, max_loops=10):
                     more_button.click()
                 except (ElementClickInterceptedException, StaleElementReferenceException) as e:
                     print(f"Direct click failed ({type(e).__name__}), trying JavaScript click...")
-                    time.sleep(1) # Wait a moment before JS click
                     # Re-find the element in case it went stale
                     more_button = WebDriverWait(driver, 10).until(
                         EC.presence_of_element_located(more_button_locator) # Wait for presence this time
@@ -124,21 +136,25 @@ def extract_reviews_selenium(url, max_loops=10):
                     driver.execute_script("arguments[0].click();", more_button)
 
                 print("Clicked 'More' button.")
-                time.sleep(3) # Increase wait time after click for content to load
+                # Wait until the review count grows instead of sleeping a fixed amount
+                try:
+                    WebDriverWait(driver, 15, poll_frequency=0.1).until(
+                        lambda d: d.execute_script(COUNT_REVIEWS_JS) > prev_count
+                    )
+                except TimeoutException:
+                    print("No new reviews loaded after clicking, likely reached the end.")
+                    break
 
                 # --- Extract ONLY newly loaded reviews ---
-                current_soup = BeautifulSoup(driver.page_source, 'html.parser')
                 newly_loaded_reviews = 0
-                review_divs = current_soup.find_all('div', class_='review')
-                for div in review_divs:
-                    review_data = parse_review_div(div)
+                for review in get_new_reviews(driver, prev_count):
                     # Add only if we have an ID and haven't seen it before
-                    if review_data and review_data['review_id'] and review_data['review_id'] not in extracted_review_ids:
-                        all_reviews_data.append(review_data)
-                        extracted_review_ids.add(review_data['review_id'])
+                    if review.review_id and review.review_id not in extracted_review_ids:
+                        extracted_review_ids.add(review.review_id)
                         newly_loaded_reviews += 1
+                        yield review
 
-                print(f"Extracted {newly_loaded_reviews} new reviews in this loop. Total unique reviews: {len(all_reviews_data)}")
+                print(f"Extracted {newly_loaded_reviews} new reviews in this loop. Total unique reviews: {len(extracted_review_ids)}")
 
                 if newly_loaded_reviews == 0:
                      print("No new reviews loaded in this loop, likely reached the end.")
@@ -163,71 +179,65 @@ def extract_reviews_selenium(url, max_loops=10):
             driver.quit()
             print("Browser closed.")
 
-    # Remove the temporary review_id before returning/saving
-    for review in all_reviews_data:
-        review.pop('review_id', None)
+# --- CSV and Excel writing ---
+def write_reviews(reviews, csv_filename="turkish_airlines_reviews.csv", excel_filename="turkish_airlines_reviews2.xlsx"):
+    """
+    Streams reviews to CSV and Excel while they are being scraped.
+
+    Each review is written to the CSV as soon as it arrives, so partial output survives a crash.
+    The Excel workbook uses XlsxWriter's constant_memory mode, which flushes each row to disk as
+    soon as the next one starts instead of keeping the whole sheet in memory until close. Strings
+    are written verbatim (no URL or formula conversion) so review text comes out as typed.
 
-    return all_reviews_data
+    Neither file is opened until the first review arrives, so a scrape that finds nothing leaves the
+    outputs of an earlier run untouched.
 
-# --- CSV and Excel writing functions remain the same ---
-def write_reviews_to_csv(reviews, filename="turkish_airlines_reviews.csv"):
-    """Writes extracted reviews to CSV."""
-    if not reviews:
+    Returns:
+        int: The number of reviews written.
+    """
+    reviews = iter(reviews)
+    first_review = next(reviews, None)
+    if first_review is None:
         print("No reviews to write.")
-        return
-    # Ensure all dicts have the same keys for DictWriter, handle potential missing keys
-    fieldnames = set()
-    for review in reviews:
-        fieldnames.update(review.keys())
-    fieldnames = sorted(list(fieldnames)) # Ensure consistent order
+        return 0
+
+    wb = xlsxwriter.Workbook(excel_filename, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'strings_to_formulas': False,
+    })
+    ws = wb.add_worksheet("Reviews")
+    ws.write_row(0, 0, FIELDNAMES) # Write header
+    count = 0
 
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore') # Ignore extra fields if any dict has fewer keys
-            writer.writeheader()
-            writer.writerows(reviews)
-        print(f"Successfully wrote reviews to {filename}")
+        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            for review in chain((first_review,), reviews):
+                row = review_row(review)
+                writer.writerow(row)
+                count += 1
+                ws.write_row(count, 0, row)
+        print(f"Successfully wrote {count} reviews to {csv_filename}")
     except Exception as e:
         print(f"Error writing to CSV file: {e}")
 
-def write_reviews_to_excel(reviews, filename="turkish_airlines_reviews2.xlsx"):
-    """Writes extracted reviews to Excel."""
-    if not reviews:
-        print("No reviews to write.")
-        return
-
     try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Reviews"
-
-        # Ensure all dicts have the same keys for header, handle potential missing keys
-        fieldnames = set()
-        for review in reviews:
-            fieldnames.update(review.keys())
-        fieldnames = sorted(list(fieldnames)) # Ensure consistent order
-
-        ws.append(fieldnames) # Write header
-
-        for review in reviews:
-            # Build row ensuring value exists for each fieldname, default to empty string if missing
-            row = [review.get(field, "") for field in fieldnames]
-            ws.append(row)
-
-        wb.save(filename)
-        print(f"Successfully wrote reviews to {filename}")
+        wb.close()
+        print(f"Successfully wrote {count} reviews to {excel_filename}")
     except Exception as e:
         print(f"Error writing to Excel file: {e}")
+    return count
 
 
 # Example Usage:
 trustindex_url = "https://www.trustindex.io/reviews/turkish-airline.com"
 # Start with a smaller max_loops for testing, e.g., 3, then increase
-reviews = extract_reviews_selenium(trustindex_url, max_loops=10)
+# Reviews are written out as they are scraped rather than collected first
+review_count = write_reviews(extract_reviews_selenium(trustindex_url, max_loops=10))
 
-if reviews:
-    print(f"\nTotal unique reviews extracted: {len(reviews)}")
-    # write_reviews_to_csv(reviews)
-    write_reviews_to_excel(reviews)
+if review_count:
+    print(f"\nTotal unique reviews extracted: {review_count}")
 else:
     print("\nNo reviews extracted or an error occurred.")
\ No newline at end of file
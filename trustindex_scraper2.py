@@ -1,20 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree, html as lh
+import re
 import json
 import csv
-from openpyxl import Workbook # Make sure openpyxl is installed: pip install openpyxl
+import xlsxwriter # Make sure XlsxWriter is installed: pip install XlsxWriter
 import time
 import logging
 import argparse
-from datetime import datetime
-import html
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, NoSuchElementException, StaleElementReferenceException, WebDriverException
 import random # For randomized delays
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from itertools import chain
+from urllib.parse import urljoin
 
 # --- Constants ---
 BASE_URL = "https://www.trustindex.io/reviews/turkish-airline.com"
@@ -25,140 +28,299 @@ MORE_BUTTON_SELECTOR = '#next-button > a.page-link'
 REVIEW_DIV_SELECTOR = 'div.review'
 # Increase wait times slightly
 WAIT_TIMEOUT_GENERAL = 25
-WAIT_TIMEOUT_STABILIZE = 15
+# Poll waits every 100ms instead of Selenium's default 500ms, so we react as soon as content is ready
+WAIT_POLL_FREQUENCY = 0.1
+# One round trip per check: the count of review divs matching arguments[0] and, once there are more than
+# arguments[1] and the document has finished loading, the outerHTML of just those new divs (null until then)
+REVIEW_SNAPSHOT_JS = """
+var reviews = document.querySelectorAll(arguments[0]);
+var html = null;
+if (reviews.length > arguments[1] && document.readyState === 'complete') {
+    html = Array.from(reviews).slice(arguments[1]).map(function (e) { return e.outerHTML; }).join('');
+}
+return {count: reviews.length, html: html};
+"""
+# Absolute URL behind the 'More' link, used to page through reviews over plain HTTP
+NEXT_PAGE_HREF_JS = "var link = document.querySelector(arguments[0]); return link ? link.href : null;"
+HTTP_TIMEOUT = 20
+# Requests the scraper never needs: avatars and other images, web fonts and trackers. Blocked through
+# CDP so initial loads and each 'More' expansion only fetch what carries review data. Stylesheets are
+# left alone because the 'More' button waits depend on it being visible and clickable.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.webp", "*.gif", "*.svg",
+    "*.woff*", "*.ttf", "*.otf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*facebook*",
+]
+
+# --- Compiled XPath expressions (compiled once, evaluated in C by lxml) ---
+def _has_class(name):
+    """XPath predicate matching a single class token, like the CSS '.name' selector."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+HTML_PARSER = lh.HTMLParser(encoding='utf-8')
+X_REVIEWS = etree.XPath(f"//div[{_has_class('review')}]")
+X_NAME = etree.XPath(f".//div[{_has_class('ti-name')}]")
+X_DATE = etree.XPath(f".//div[{_has_class('ti-date')}]")
+X_STARS = etree.XPath(f".//div[{_has_class('ti-stars')}]")
+X_FILLED_STARS = etree.XPath(f"count(.//span[{_has_class('ti-star')} and {_has_class('f')}])")
+X_BODY = etree.XPath(f".//div[{_has_class('ti-review-content')}]")
+X_BODY_PARTS = etree.XPath("descendant::text() | descendant::br")
+X_NEXT_PAGE_HREF = etree.XPath(f"//*[@id='next-button']/a[{_has_class('page-link')}]/@href")
+# Platform the review was imported from, e.g. 'source-Google' -> 'Google'
+_SOURCE_RE = re.compile(r'(?:^|\s)source-(\S+)') # Whole class names only, so e.g. 'ti-source-x' does not match
+
+# --- Review Record ---
+@dataclass(slots=True)
+class Review:
+    """One scraped review. Slots keep thousands of records small and cheap to build."""
+    review_id: str
+    author: str | None
+    date: str | None
+    rating: int | None
+    body: str | None
+    source_platform: str
+
+# Output column order, taken from the Review fields so the two can't drift apart
+FIELDNAMES = tuple(f.name for f in fields(Review))
+# Builds a row tuple straight from the slots; astuple() would deep-copy every field
+review_row = attrgetter(*FIELDNAMES)
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- Parse Function ---
-def parse_review_div(review_div):
-    """Helper function to parse a single review div element."""
-    review_data = {}
-    # Use .get() with a default to avoid KeyError if 'data-id' is missing
-    review_id = review_div.get('data-id')
-    if not review_id:
-        logging.warning("Found review div without data-id, skipping.")
-        return None
-
-    review_data['review_id'] = review_id
-
-    try:
-        review_data['author'] = review_div.find('div', class_='ti-name').text.strip()
-    except AttributeError:
-        review_data['author'] = None
+def get_review_id(review_div):
+    """Returns the review's data-id (None if missing). Cheap enough to run before any field extraction."""
+    return review_div.get('data-id')
+
+def parse_review_fields(review_div, review_id):
+    """Helper function to parse the fields of a single review div element into a Review."""
+    # Skip building debug messages in this hot path unless DEBUG logging is actually on
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    name_els = X_NAME(review_div)
+    author = name_els[0].text_content().strip() if name_els else None
+    if not name_els and debug:
         logging.debug(f"Could not find author for review {review_id}")
 
-    try:
-        date_str = review_div.find('div', class_='ti-date').text.strip()
+    date_els = X_DATE(review_div)
+    if date_els:
+        date_str = date_els[0].text_content().strip()
+        # Trustindex dates are 'YYYY.MM.DD', so a plain split-and-join gives ISO format without building a datetime
         try:
-            dt_obj = datetime.strptime(date_str, '%Y.%m.%d')
-            review_data['date'] = dt_obj.strftime('%Y-%m-%d') # Store in ISO format
+            year, month, day = date_str.split('.')
+            # Range-check the parts like strptime would, so an impossible date still falls back to the raw string
+            if not (year.isdigit() and month.isdigit() and day.isdigit() and 1 <= int(month) <= 12 and 1 <= int(day) <= 31):
+                raise ValueError(date_str)
+            date = f"{year}-{month:0>2}-{day:0>2}" # Store in ISO format
         except ValueError:
             logging.warning(f"Could not parse date string: {date_str} for review {review_id}. Storing raw.")
-            review_data['date'] = date_str
-    except AttributeError:
-        review_data['date'] = None
-        logging.debug(f"Could not find date for review {review_id}")
-
-    try:
-        # More robust rating extraction: handle cases with 0 stars
-        star_container = review_div.find('div', class_='ti-stars')
-        if star_container:
-             review_data['rating'] = len(star_container.find_all('span', class_='ti-star f'))
-        else:
-             review_data['rating'] = None # Or 0 if appropriate
-             logging.debug(f"Could not find star container for review {review_id}")
-    except Exception as e: # Catch broader exceptions during parsing
-        review_data['rating'] = None
-        logging.warning(f"Error parsing rating for review {review_id}: {e}")
-
-    try:
-        content_div = review_div.find('div', class_='ti-review-content')
-        if content_div:
-            for br in content_div.find_all('br'):
-                br.replace_with('\n')
-            raw_body = content_div.text.strip()
-            review_data['body'] = html.unescape(raw_body)
-        else:
-            review_data['body'] = None
-            logging.debug(f"Could not find body div for review {review_id}")
-    except AttributeError:
-        review_data['body'] = None
-        logging.debug(f"Could not find/parse body for review {review_id}")
-
+            date = date_str
+    else:
+        date = None
+        if debug: logging.debug(f"Could not find date for review {review_id}")
+
+    # More robust rating extraction: handle cases with 0 stars
+    star_containers = X_STARS(review_div)
+    rating = int(X_FILLED_STARS(star_containers[0])) if star_containers else None
+    if not star_containers and debug:
+        logging.debug(f"Could not find star container for review {review_id}")
+
+    content_divs = X_BODY(review_div)
+    if content_divs:
+        # Text nodes and <br> elements come back in document order, so no tree mutation is needed.
+        # lxml has already decoded entities, so the text is used as-is.
+        body = ''.join(
+            part if isinstance(part, str) else '\n' for part in X_BODY_PARTS(content_divs[0])
+        ).strip()
+    else:
+        body = None
+        if debug: logging.debug(f"Could not find body div for review {review_id}")
+
+    # lxml exposes the class attribute as one string, so search it directly
+    source_match = _SOURCE_RE.search(review_div.get('class', ''))
+    source_platform = source_match.group(1) if source_match else 'Unknown'
+
+    return Review(review_id, author, date, rating, body, source_platform)
+
+# --- HTTP Pagination Helpers ---
+def session_from_driver(driver):
+    """Builds a requests session that presents the browser's user agent and cookies."""
+    session = requests.Session()
+    session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return session
+
+def fetch_review_page(session, page_url):
+    """
+    Fetches one review page without the browser.
+
+    Returns:
+        tuple: (review_divs, next_page_url), or None if the response is not a usable
+               review page (request error, bad status, anti-bot challenge, ...).
+    """
     try:
-        source_class = review_div.get('class', []) # Use .get with default empty list
-        review_data['source_platform'] = next((s.replace('source-', '') for s in source_class if s.startswith('source-')), 'Unknown')
-    except StopIteration:
-         review_data['source_platform'] = 'Unknown'
-         logging.debug(f"Could not determine source platform class for review {review_id}")
-    except Exception as e:
-         review_data['source_platform'] = 'Unknown'
-         logging.warning(f"Error getting source platform for review {review_id}: {e}")
-
+        response = session.get(page_url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        root = lh.document_fromstring(response.content, parser=HTML_PARSER)
+    except (requests.exceptions.RequestException, etree.ParserError) as e:
+        logging.warning(f"HTTP fetch of {page_url} failed: {e}")
+        return None
 
-    return review_data
+    review_divs = X_REVIEWS(root)
+    if not review_divs:
+        logging.warning(f"No reviews in the HTTP response for {page_url} (possibly an anti-bot challenge).")
+        return None
+    next_hrefs = X_NEXT_PAGE_HREF(root)
+    next_page_url = urljoin(response.url, next_hrefs[0]) if next_hrefs else None
+    return review_divs, next_page_url
 
 # --- Selenium Extraction Function ---
-def extract_reviews_selenium(url, max_loops):
+def extract_reviews_selenium(url, max_loops, http_pagination=True, debugger_address=None):
+    """
+    Generator: yields each unique Review as soon as it is parsed, so callers can stream it to disk.
+
+    If debugger_address (e.g. "127.0.0.1:9222") is given, attaches to an already running Chrome
+    instead of launching one. The scrape runs in its own tab, which is closed afterwards while the
+    browser itself is left running for the next run.
+    """
     extracted_review_ids = set()
-    all_reviews_data = []
     driver = None
+    session = None
 
     try:
         # --- Chrome Options ---
         chrome_options = Options()
-        # chrome_options.add_argument("--headless=new") # Try the newer headless mode syntax
-        chrome_options.add_argument("--headless") # Fallback if new syntax fails
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1200") # Slightly larger height
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled") # Try to hide automation
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation","enable-logging"]) # Further hide automation
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("--log-level=3")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36") # Use a common, recent user agent
-
-        logging.info(f"Initializing Selenium WebDriver...")
-        driver = webdriver.Chrome(options=chrome_options)
+        if debugger_address:
+            # Launch flags and automation switches belong to the shared browser; only attach here
+            chrome_options.add_experimental_option("debuggerAddress", debugger_address)
+        else:
+            # chrome_options.add_argument("--headless=new") # Try the newer headless mode syntax
+            chrome_options.add_argument("--headless") # Fallback if new syntax fails
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--window-size=1920,1200") # Slightly larger height
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--disable-blink-features=AutomationControlled") # Try to hide automation
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation","enable-logging"]) # Further hide automation
+            chrome_options.add_experimental_option('useAutomationExtension', False)
+            chrome_options.add_argument("--log-level=3")
+            chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36") # Use a common, recent user agent
+
+        if debugger_address:
+            logging.info(f"Attaching Selenium WebDriver to Chrome at {debugger_address}...")
+            driver = webdriver.Chrome(options=chrome_options)
+            # Work in a fresh tab so the shared browser's existing tabs are left alone
+            driver.switch_to.new_window('tab')
+        else:
+            logging.info(f"Initializing Selenium WebDriver...")
+            driver = webdriver.Chrome(options=chrome_options)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except WebDriverException as e:
+            logging.warning(f"Could not block images/fonts/trackers via CDP, loading everything: {e}")
         # Set longer implicit wait? Sometimes helpful, sometimes hides issues. Let's stick to explicit for now.
         # driver.implicitly_wait(5)
-        wait = WebDriverWait(driver, WAIT_TIMEOUT_GENERAL)
-        stabilize_wait = WebDriverWait(driver, WAIT_TIMEOUT_STABILIZE)
+        wait = WebDriverWait(driver, WAIT_TIMEOUT_GENERAL, poll_frequency=WAIT_POLL_FREQUENCY)
 
         logging.info(f"Loading page: {url}")
         driver.get(url)
-        # Add a small wait after initial load for elements to potentially settle
-        time.sleep(2)
+        # Wait for the first reviews to render instead of sleeping a fixed amount
+        try:
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, REVIEW_DIV_SELECTOR)))
+        except TimeoutException:
+            logging.warning("Timed out waiting for the first reviews to render. Continuing anyway.")
         logging.info("Page loaded.")
 
-        # --- Helper to get review divs from current page source ---
+        # --- Helper to get review divs from an HTML string (full page or review fragment) ---
         def get_review_divs_from_source(page_source):
+            if not page_source:
+                return []
             try:
-                soup = BeautifulSoup(page_source, 'html.parser')
-                return soup.select(REVIEW_DIV_SELECTOR)
+                # Parse straight into an lxml tree; UTF-8 bytes let libxml2 skip re-decoding
+                root = lh.document_fromstring(page_source.encode('utf-8'), parser=HTML_PARSER)
+                return X_REVIEWS(root)
             except Exception as e:
-                logging.error(f"Error parsing page source with BeautifulSoup: {e}")
+                logging.error(f"Error parsing page source with lxml: {e}")
                 return []
 
+        # --- Helper to keep only reviews we have not seen yet ---
+        def new_unique_reviews(review_divs):
+            # Deduplicate on data-id alone first, so already seen reviews never pay for field extraction
+            unseen = []
+            for div in review_divs:
+                review_id = get_review_id(div)
+                if not review_id:
+                    logging.warning("Found review div without data-id, skipping.")
+                    continue
+                if review_id in extracted_review_ids:
+                    continue
+                extracted_review_ids.add(review_id)
+                unseen.append((review_id, div))
+            return [parse_review_fields(div, review_id) for review_id, div in unseen]
+
+        def extract_initial_reviews():
+            """Returns the new reviews on the currently loaded page and its review div count."""
+            snapshot = driver.execute_script(REVIEW_SNAPSHOT_JS, REVIEW_DIV_SELECTOR, 0)
+            new_reviews = new_unique_reviews(get_review_divs_from_source(snapshot['html']))
+            logging.info(f"Extracted {len(new_reviews)} initial reviews.")
+            return new_reviews, snapshot['count']
+
         # --- Initial extraction ---
         logging.info("Extracting initial reviews...")
-        initial_divs = get_review_divs_from_source(driver.page_source)
-        initial_count = 0
-        for div in initial_divs:
-            review_data = parse_review_div(div)
-            if review_data and review_data['review_id'] and review_data['review_id'] not in extracted_review_ids:
-                all_reviews_data.append(review_data)
-                extracted_review_ids.add(review_data['review_id'])
-                initial_count += 1
-        logging.info(f"Extracted {initial_count} initial reviews.")
-        last_known_review_id_count = len(extracted_review_ids)
+        # Review divs currently in the DOM, kept up to date from each snapshot instead of re-counting
+        new_reviews, dom_review_count = extract_initial_reviews()
+        yield from new_reviews
 
         loop_count = 0
-        while loop_count < max_loops:
-            num_reviews_before_click = len(driver.find_elements(By.CSS_SELECTOR, REVIEW_DIV_SELECTOR))
+        reached_end = False
+
+        # --- Fast path: follow the 'More' link over plain HTTP, no clicking or rendering ---
+        next_page_url = driver.execute_script(NEXT_PAGE_HREF_JS, MORE_BUTTON_SELECTOR) if http_pagination else None
+        if next_page_url and next_page_url.startswith('http'):
+            session = session_from_driver(driver)
+            while loop_count < max_loops:
+                logging.info(f"Fetching page {loop_count + 1}/{max_loops} over HTTP: {next_page_url}")
+                page = fetch_review_page(session, next_page_url)
+                if page is None:
+                    break
+                review_divs, following_page_url = page
+                new_reviews = new_unique_reviews(review_divs)
+                logging.info(f"Extracted {len(new_reviews)} new reviews from this page. Total unique reviews: {len(extracted_review_ids)}")
+                if not new_reviews and (loop_count == 0 or following_page_url == next_page_url):
+                    # The link led back to reviews we already have (e.g. href="#", or the page parameter is
+                    # ignored without JS), so it does not paginate over HTTP; let the click loop take over
+                    logging.info("The 'More' link did not lead to new reviews over HTTP.")
+                    break
+                yield from new_reviews
+                loop_count += 1
+                if not new_reviews or not following_page_url:
+                    logging.info("No further review pages. Assuming end of reviews.")
+                    reached_end = True
+                    break
+                next_page_url = following_page_url
+                time.sleep(random.uniform(0.5, 1.0)) # Polite delay between plain HTTP requests
+
+            if not reached_end and loop_count < max_loops:
+                logging.info("HTTP pagination unavailable, falling back to clicking 'More' in the browser.")
+                if loop_count > 0:
+                    # Resume in the browser from the page the plain HTTP fetch could not handle
+                    driver.get(next_page_url)
+                    try:
+                        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, REVIEW_DIV_SELECTOR)))
+                    except TimeoutException:
+                        logging.warning("Timed out waiting for the reviews of the resumed page to render. Continuing anyway.")
+                    new_reviews, dom_review_count = extract_initial_reviews()
+                    yield from new_reviews
+                    loop_count += 1
+
+        last_known_review_id_count = len(extracted_review_ids)
+
+        while not reached_end and loop_count < max_loops:
+            num_reviews_before_click = dom_review_count
             logging.debug(f"Review divs found before click {loop_count+1}: {num_reviews_before_click}")
 
             try:
@@ -176,7 +338,6 @@ def extract_reviews_selenium(url, max_loops):
                 # 2. Scroll into view
                 try:
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'nearest'});", more_button)
-                    time.sleep(random.uniform(0.5, 1.0)) # Random small delay after scroll
                     logging.debug("Scrolled button into view.")
                 except Exception as scroll_e:
                     logging.warning(f"Could not scroll button into view: {scroll_e}. Proceeding anyway.")
@@ -197,7 +358,6 @@ def extract_reviews_selenium(url, max_loops):
                     more_button.click()
                 except (ElementClickInterceptedException, StaleElementReferenceException) as e:
                     logging.warning(f"Direct click failed ({type(e).__name__}), trying JavaScript click...")
-                    time.sleep(random.uniform(1.0, 2.0))
                     try:
                         # It's crucial to re-find the element before JS click if direct click failed
                         more_button = wait.until(EC.presence_of_element_located(more_button_locator))
@@ -210,20 +370,15 @@ def extract_reviews_selenium(url, max_loops):
 
                 # 5. --- Wait for content to actually load ---
                 try:
-                    # Primary strategy: Wait for the count to increase
-                    wait.until(lambda driver: len(driver.find_elements(By.CSS_SELECTOR, REVIEW_DIV_SELECTOR)) > num_reviews_before_click)
-                    new_review_dom_count = len(driver.find_elements(By.CSS_SELECTOR, REVIEW_DIV_SELECTOR))
-                    logging.info(f"Detected an increase in review count to {new_review_dom_count}.")
+                    # Wait for the count to increase and the document to be ready. Each poll is a single
+                    # snapshot call that already carries the new reviews' HTML once both hold.
+                    def new_reviews_loaded(driver):
+                        snapshot = driver.execute_script(REVIEW_SNAPSHOT_JS, REVIEW_DIV_SELECTOR, num_reviews_before_click)
+                        return snapshot if snapshot['html'] is not None else False
 
-                    # Secondary stabilization: Wait for the *last* new element to be present
-                    last_element_xpath = f"({REVIEW_DIV_SELECTOR})[{new_review_dom_count}]"
-                    try:
-                         stabilize_wait.until(EC.presence_of_element_located((By.XPATH, last_element_xpath)))
-                         logging.debug(f"Last expected review element ({new_review_dom_count}) is present.")
-                         time.sleep(random.uniform(0.5, 1.0)) # Short randomized delay after stabilization
-                    except TimeoutException:
-                         logging.warning(f"Timed out waiting for the last element ({new_review_dom_count}) to stabilize. Parsing might be incomplete.")
-                         # Continue but be aware
+                    snapshot = wait.until(new_reviews_loaded)
+                    dom_review_count = snapshot['count']
+                    logging.info(f"Detected an increase in review count to {dom_review_count}.")
 
                 except TimeoutException:
                     # Count didn't increase. Check if button is gone.
@@ -240,14 +395,10 @@ def extract_reviews_selenium(url, max_loops):
 
 
                 # 6. --- Extract ONLY newly loaded reviews ---
-                current_divs = get_review_divs_from_source(driver.page_source)
-                newly_loaded_reviews_in_loop = 0
-                for div in current_divs:
-                    review_data = parse_review_div(div)
-                    if review_data and review_data['review_id'] and review_data['review_id'] not in extracted_review_ids:
-                        all_reviews_data.append(review_data)
-                        extracted_review_ids.add(review_data['review_id'])
-                        newly_loaded_reviews_in_loop += 1
+                # The snapshot holds just the review divs appended after the click, not the whole page
+                new_reviews = new_unique_reviews(get_review_divs_from_source(snapshot['html']))
+                newly_loaded_reviews_in_loop = len(new_reviews)
+                yield from new_reviews
 
                 logging.info(f"Extracted {newly_loaded_reviews_in_loop} new reviews in this loop. Total unique reviews: {len(extracted_review_ids)}")
                 current_unique_count = len(extracted_review_ids)
@@ -262,8 +413,6 @@ def extract_reviews_selenium(url, max_loops):
                 last_known_review_id_count = current_unique_count # Update the count
 
                 loop_count += 1
-                # Random delay before next loop
-                time.sleep(random.uniform(1.5, 3.0))
 
             # Outer loop exceptions
             except TimeoutException as e_outer:
@@ -279,64 +428,72 @@ def extract_reviews_selenium(url, max_loops):
     except Exception as e_setup:
         logging.error(f"An error occurred during Selenium setup or initial load: {e_setup}", exc_info=True)
     finally:
+        if session:
+            session.close()
         if driver:
-            driver.quit()
-            logging.info("Browser closed.")
-
-    # Remove temporary ID before returning
-    for review in all_reviews_data:
-        review.pop('review_id', None)
-
-    return all_reviews_data
-
-
-# --- CSV/Excel Writing Functions ---
-# (Keep the robust versions from the previous answer that handle missing keys)
-def write_reviews_to_csv(reviews, filename):
-    """Writes extracted reviews to CSV."""
-    if not reviews:
-        logging.warning("No reviews provided to write_reviews_to_csv.")
-        return
-    fieldnames = set()
-    for review in reviews:
-        fieldnames.update(review.keys())
-    fieldnames = sorted(list(fieldnames)) # Ensure consistent order
+            if debugger_address:
+                # Close only our tab and stop chromedriver; the shared browser keeps running
+                try:
+                    driver.close()
+                except WebDriverException as e:
+                    logging.warning(f"Could not close the scraping tab: {e}")
+                driver.service.stop()
+                logging.info("Detached from shared browser.")
+            else:
+                driver.quit()
+                logging.info("Browser closed.")
+
+
+# --- CSV/Excel Writing ---
+def write_reviews(reviews, csv_filename, excel_filename):
+    """
+    Streams reviews to CSV and Excel while they are being scraped.
+
+    Each review is written to the CSV as soon as it arrives, so partial output survives a crash.
+    The Excel workbook uses XlsxWriter's constant_memory mode, which flushes each row to disk as
+    soon as the next one starts instead of keeping the whole sheet in memory until close. Strings
+    are written verbatim (no URL or formula conversion) so review text comes out as typed.
+
+    Neither file is created until the first review arrives, so an empty scrape (e.g. Chrome failed
+    to start) leaves the outputs of an earlier run untouched.
+
+    Returns:
+        int: The number of reviews written.
+    """
+    reviews = iter(reviews)
+    first_review = next(reviews, None)
+    if first_review is None:
+        logging.warning("No reviews to write. Existing output files were left untouched.")
+        return 0
+
+    wb = xlsxwriter.Workbook(excel_filename, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'strings_to_formulas': False,
+    })
+    ws = wb.add_worksheet("Reviews")
+    ws.write_row(0, 0, FIELDNAMES) # Write header
+    count = 0
 
     try:
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            # Use ignore for extrasaction if some dicts might miss keys compared to others
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(reviews)
-        logging.info(f"Successfully wrote {len(reviews)} reviews to {filename}")
+        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(FIELDNAMES)
+            for review in chain((first_review,), reviews):
+                row = review_row(review)
+                writer.writerow(row)
+                count += 1
+                ws.write_row(count, 0, row)
+        logging.info(f"Successfully wrote {count} reviews to {csv_filename}")
     except Exception as e:
-        logging.error(f"Error writing to CSV file '{filename}': {e}", exc_info=True)
-
-def write_reviews_to_excel(reviews, filename):
-    """Writes extracted reviews to Excel."""
-    if not reviews:
-        logging.warning("No reviews provided to write_reviews_to_excel.")
-        return
-    fieldnames = set()
-    for review in reviews:
-        fieldnames.update(review.keys())
-    fieldnames = sorted(list(fieldnames)) # Ensure consistent order
+        logging.error(f"Error writing to CSV file '{csv_filename}': {e}", exc_info=True)
 
     try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Reviews"
-        ws.append(fieldnames) # Write header
-
-        for review in reviews:
-            # Build row ensuring value exists for each fieldname, default to empty string
-            row = [review.get(field, "") for field in fieldnames]
-            ws.append(row)
-
-        wb.save(filename)
-        logging.info(f"Successfully wrote {len(reviews)} reviews to {filename}")
+        wb.close()
+        logging.info(f"Successfully wrote {count} reviews to {excel_filename}")
     except Exception as e:
-       logging.error(f"Error writing to Excel file '{filename}': {e}", exc_info=True)
+       logging.error(f"Error writing to Excel file '{excel_filename}': {e}", exc_info=True)
+    return count
 
 
 # --- Main Execution Block with Argparse ---
@@ -347,8 +504,10 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--csv", default=DEFAULT_CSV_FILENAME, help="Output CSV filename.")
     parser.add_argument("-x", "--excel", default=DEFAULT_EXCEL_FILENAME, help="Output Excel filename.")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable DEBUG logging level.")
+    parser.add_argument("--no-http-pagination", action="store_true", help="Always click 'More' in the browser instead of fetching further pages over plain HTTP.")
     # Add option to run non-headless for debugging
     parser.add_argument("--show-browser", action="store_true", help="Run with a visible browser window instead of headless.")
+    parser.add_argument("--debugger-address", metavar="HOST:PORT", help="Attach to an already running Chrome started with --remote-debugging-port (e.g. 127.0.0.1:9222) instead of launching a new one.")
 
 
     args = parser.parse_args()
@@ -375,12 +534,12 @@ if __name__ == "__main__":
     # --- Call extraction function (pass modified options if needed, though it's self-contained now) ---
     logging.info("Starting review scraping process...")
     # The extract_reviews_selenium function now configures its own options
-    extracted_reviews = extract_reviews_selenium(args.url, args.loops) # We now pass the configured options
+    extracted_reviews = extract_reviews_selenium(args.url, args.loops, http_pagination=not args.no_http_pagination, debugger_address=args.debugger_address) # We now pass the configured options
 
-    if extracted_reviews:
-        logging.info(f"Total unique reviews extracted: {len(extracted_reviews)}")
-        write_reviews_to_csv(extracted_reviews, args.csv)
-        write_reviews_to_excel(extracted_reviews, args.excel)
+    # Reviews are written out as they are scraped rather than collected first
+    review_count = write_reviews(extracted_reviews, args.csv, args.excel)
+    if review_count:
+        logging.info(f"Total unique reviews extracted: {review_count}")
     else:
         logging.warning("No reviews were extracted.")
 
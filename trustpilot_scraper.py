@@ -1,6 +1,13 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
 import json
+try:
+    import orjson as _json # Much faster on the large __NEXT_DATA__ payloads: pip install orjson
+except ImportError:
+    _json = json
 import csv
 from openpyxl import Workbook
 import time
@@ -9,12 +16,35 @@ import argparse
 from datetime import datetime
 import html
 import random
+from types import MappingProxyType
+import re
+import os
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import socket
+from contextlib import closing
+from itertools import chain
+from urllib.parse import urlsplit
 
 # --- Constants ---
 TRUSTPILOT_BASE_URL = "https://www.trustpilot.com/review/www.turkishairlines.com"
 DEFAULT_CSV_FILENAME = "turkish_airlines_trustpilot_reviews.csv"
 DEFAULT_EXCEL_FILENAME = "turkish_airlines_trustpilot_reviews.xlsx"
+DEFAULT_JSONL_FILENAME = "turkish_airlines_trustpilot_reviews.jsonl" # Raw per-review log that --resume appends to
+DEFAULT_CHECKPOINT_FILENAME = "turkish_airlines_trustpilot_checkpoint.json"
 DEFAULT_MAX_PAGES = 0 # 0 means scrape all available pages
+REQUEST_TIMEOUT = (5, 15) # (connect, read) seconds; the read timeout applies per socket read, not to the whole response
+# Pages fetched concurrently once the total page count is known. The shared rate gate caps the combined
+# rate at one request per MIN_REQUEST_INTERVAL however many workers there are, so a second worker only
+# lets one slow response overlap the wait for the next slot; more would just queue on the gate.
+FETCH_WORKERS = 2
+MIN_REQUEST_INTERVAL = 1.5 # Minimum seconds between two requests to the same domain
+REQUEST_JITTER = 1.0 # Up to this many random seconds are added whenever the gate has to wait
+RETRY_STATUSES = [429, 502, 503, 504] # Rate-limited or transient server errors, retried by the session
+MAX_CONSECUTIVE_FAILED_PAGES = 3 # Temporarily failed pages skipped in a row before the scrape gives up
+# Output columns, i.e. the keys of the review dicts parse_trustpilot_review_data produces
+REVIEW_FIELDS = ['author', 'body', 'consumer_country', 'consumer_reviews_count', 'date_experience', 'date_published',
+                 'is_verified', 'language', 'likes', 'rating', 'title', 'verification_source']
 
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO,
@@ -23,194 +53,443 @@ logging.basicConfig(level=logging.INFO,
 # --- User Agent ---
 # Use a common user agent to mimic a real browser
 HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36'
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
+    # 'gzip,deflate', plus 'br' when Brotli is installed (pip install Brotli), so only encodings we can decode are offered
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
 }
 
-# --- Parse Function ---
-def parse_trustpilot_review_data(review_json):
-    """Helper function to parse a single review JSON object from Trustpilot __NEXT_DATA__."""
-    review_data = {}
-
-    # Extract data using .get() to avoid KeyErrors if fields are missing
-    review_data['id'] = review_json.get('id') # Unique review ID from Trustpilot
-    consumer = review_json.get('consumer', {})
-    review_data['author'] = consumer.get('displayName')
-    review_data['consumer_id'] = consumer.get('id') # Can be useful
-    review_data['consumer_reviews_count'] = consumer.get('numberOfReviews')
-    review_data['consumer_country'] = consumer.get('countryCode')
-
-    dates = review_json.get('dates', {})
-    published_date_str = dates.get('publishedDate')
-    experienced_date_str = dates.get('experiencedDate')
-
-    # Parse dates (Trustpilot uses ISO 8601 format with timezone)
+# The review data lives in one JSON script tag, which is cut straight out of the raw response bytes
+_NEXT_RE = re.compile(rb'<script[^>]*\bid="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+# Review texts only carry simple markup, so regexes are enough to clean them up.
+# <br> becomes a line break, and so does each run of paragraph/block boundaries, so paragraphs do not run together.
+_BREAK_RE = re.compile(r'<br\s*/?>|(?:\s*(?:<p\b[^>]*>|</(?:p|div|li)\s*>))+', re.I)
+# Only real tags (a letter right after '<' or '</'), so text like "<3" or "pitch <30in ... >" survives
+_TAG_RE = re.compile(r'</?[A-Za-z][^>]*>')
+
+# Shared stand-in for missing nested JSON objects; read-only so it can never be mutated by accident
+_EMPTY = MappingProxyType({})
+
+# --- HTTP Session ---
+# One shared session keeps the TLS connection to trustpilot.com alive across pages instead of
+# handshaking for every request. Rate-limited (429) and transient 5xx responses are retried up to
+# 5 times, waiting for Retry-After when the server sends it and otherwise backing off exponentially
+# (capped at 60s) with random jitter so the fetch workers don't retry in lockstep.
+# Pooled sockets keep urllib3's default TCP_NODELAY and also send TCP keep-alive probes, so idle
+# connections between pages are not silently dropped by NATs or proxies along the way
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)] + [
+    (socket.IPPROTO_TCP, getattr(socket, name), value)
+    for name, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name) # Probe timing knobs that not every platform exposes
+]
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools open their sockets with SOCKET_OPTIONS."""
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', KeepAliveHTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=8,
+    max_retries=Retry(total=5, backoff_factor=1.5, backoff_jitter=1.0, backoff_max=60,
+                      status_forcelist=RETRY_STATUSES, respect_retry_after_header=True),
+))
+
+# --- Date Helpers ---
+def _parse_iso_date(date_str, fmt, label):
+    """Slow path: parses an ISO 8601 string with datetime and formats it, or returns it raw if that fails."""
     try:
         # Remove the 'Z' and parse
-        dt_obj = datetime.fromisoformat(published_date_str.replace('Z', '+00:00'))
-        review_data['date_published'] = dt_obj.strftime('%Y-%m-%d %H:%M:%S') # Store in a standard format
-    except (ValueError, TypeError):
-        logging.warning(f"Could not parse published date: {published_date_str}. Storing raw.")
-        review_data['date_published'] = published_date_str
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime(fmt)
+    except (ValueError, TypeError, AttributeError):
+        logging.warning(f"Could not parse {label} date: {date_str}. Storing raw.")
+        return date_str
+
+def _fmt_published(date_str):
+    """'2024-03-05T10:11:12.000Z' -> '2024-03-05 10:11:12', by slicing when the string has the usual shape."""
+    if (date_str and len(date_str) >= 19 and date_str[10] == 'T'
+            and date_str[4] == date_str[7] == '-' and date_str[13] == date_str[16] == ':'):
+        return f"{date_str[0:10]} {date_str[11:19]}"
+    return _parse_iso_date(date_str, '%Y-%m-%d %H:%M:%S', 'published')
+
+def _fmt_experience(date_str):
+    """'2024-03-01T00:00:00.000Z' -> '2024-03-01', by slicing when the string has the usual shape."""
+    if date_str and len(date_str) >= 10 and date_str[4] == date_str[7] == '-':
+        return date_str[0:10]
+    return _parse_iso_date(date_str, '%Y-%m-%d', 'experience')
 
-    try:
-        dt_obj = datetime.fromisoformat(experienced_date_str.replace('Z', '+00:00'))
-        review_data['date_experience'] = dt_obj.strftime('%Y-%m-%d') # Store date part only
-    except (ValueError, TypeError):
-        logging.warning(f"Could not parse experience date: {experienced_date_str}. Storing raw.")
-        review_data['date_experience'] = experienced_date_str
+# --- Parse Function ---
+def parse_trustpilot_review_data(review_json):
+    """
+    Helper function to parse a single review JSON object from Trustpilot __NEXT_DATA__.
 
+    Returns:
+        tuple: (review_id, review_data). The Trustpilot review ID is only needed for deduplication,
+               so it is returned alongside the output fields instead of inside them.
+    """
+    # Bind the lookups once; missing (or null) nested objects fall back to the shared read-only _EMPTY
+    # instead of allocating a fresh {} per review
+    get = review_json.get
+    consumer = get('consumer') or _EMPTY
+    dates = get('dates') or _EMPTY
+    verification_info = (get('labels') or _EMPTY).get('verification') or _EMPTY
+    consumer_get = consumer.get
+    verification_get = verification_info.get
+
+    # Trustpilot text often contains <br> or <p> blocks, replace their breaks with newlines, drop the remaining tags and decode entities
+    body = _TAG_RE.sub('', _BREAK_RE.sub('\n', get('text') or ''))
+
+    return get('id'), {
+        'author': consumer_get('displayName'),
+        'consumer_reviews_count': consumer_get('numberOfReviews'),
+        'consumer_country': consumer_get('countryCode'),
+        # Trustpilot uses ISO 8601 format with timezone
+        'date_published': _fmt_published(dates.get('publishedDate')), # Store in a standard format
+        'date_experience': _fmt_experience(dates.get('experiencedDate')), # Store date part only
+        'rating': get('rating'),
+        'title': get('title'),
+        'body': html.unescape(body).strip(),
+        'language': get('language'),
+        'likes': get('likes', 0),
+        # Check verification status if needed (might require deeper inspection of 'labels')
+        'is_verified': verification_get('isVerified', False),
+        'verification_source': verification_get('reviewSourceName', 'Unknown'),
+    }
+
+
+# --- Rate Gate ---
+# Start time of the most recent request per domain (time.monotonic()), shared by all fetch workers
+_last_request_ts = {}
+_rate_lock = threading.Lock()
+
+def wait_for_rate_gate(url):
+    """
+    Blocks until a request to url's domain is allowed, i.e. MIN_REQUEST_INTERVAL after the previous one.
 
-    review_data['rating'] = review_json.get('rating')
-    review_data['title'] = review_json.get('title')
+    Only the remainder of the interval is slept, so time spent waiting on a slow response already
+    counts towards it. The slot is reserved under the lock and slept outside it, so concurrent
+    workers queue up one interval apart instead of all waking at once.
+    """
+    domain = urlsplit(url).netloc
+    with _rate_lock:
+        now = time.monotonic()
+        wait = MIN_REQUEST_INTERVAL - (now - _last_request_ts.get(domain, float('-inf')))
+        wait = wait + random.uniform(0, REQUEST_JITTER) if wait > 0 else 0.0
+        _last_request_ts[domain] = now + wait
+    if wait > 0:
+        time.sleep(wait)
+
+# --- Page Fetching ---
+# Returned by fetch_page_data instead of None when the page failed for a reason that may go away
+# (timeout, dropped connection, retries exhausted on a RETRY_STATUSES response)
+TEMPORARY_FAILURE = object()
+
+def fetch_page_data(page_url):
+    """
+    Fetches one Trustpilot review page and decodes its __NEXT_DATA__ payload.
 
-    raw_body = review_json.get('text', '')
-    # Trustpilot text often contains <br>, replace with newline and decode entities
-    soup = BeautifulSoup(raw_body.replace('<br />', '\n').replace('<br>', '\n'), 'html.parser')
-    review_data['body'] = html.unescape(soup.get_text(separator='\n').strip())
+    Returns:
+        dict: The decoded page data. TEMPORARY_FAILURE if the fetch failed for a transient reason,
+              or None if the page could not be fetched or decoded otherwise (e.g. 403, challenge page).
+    """
+    wait_for_rate_gate(page_url)
+    logging.info(f"Requesting page: {page_url}")
+    try:
+        response = SESSION.get(page_url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.RetryError) as e:
+        logging.warning(f"Temporary failure fetching {page_url}: {e}")
+        return TEMPORARY_FAILURE
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code in RETRY_STATUSES:
+            logging.warning(f"Temporary failure fetching {page_url}: {e}")
+            return TEMPORARY_FAILURE
+        logging.error(f"Failed to fetch {page_url}: {e}")
+        return None
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Failed to fetch {page_url}: {e}")
+        return None
+    logging.debug(f"Fetched {page_url} (Content-Encoding: {response.headers.get('Content-Encoding', 'identity')})")
 
-    review_data['language'] = review_json.get('language')
-    review_data['likes'] = review_json.get('likes', 0)
+    try:
+        match = _NEXT_RE.search(response.content)
+        if not match:
+            logging.warning(f"Could not find __NEXT_DATA__ script tag on {page_url}.")
+            return None
+
+        return _json.loads(match.group(1)) # Both decoders take the captured bytes directly
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses it
+        logging.error(f"Error decoding JSON data from __NEXT_DATA__ on {page_url}.")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred processing {page_url}: {e}", exc_info=True)
+    return None
 
-    # Check verification status if needed (might require deeper inspection of 'labels')
-    verification_info = review_json.get('labels', {}).get('verification', {})
-    review_data['is_verified'] = verification_info.get('isVerified', False)
-    review_data['verification_source'] = verification_info.get('reviewSourceName', 'Unknown')
+def _gather_pages(fetch_page, page_numbers, concurrency=FETCH_WORKERS):
+    """
+    Generator: fetches a batch of pages on a thread pool and yields (page_number, page_data) in page order.
 
+    Every page is submitted up front; request pacing is left to the rate gate. Closing the generator
+    early cancels the fetches that have not started yet.
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        # map() hands results back in page order as they complete
+        yield from zip(page_numbers, executor.map(fetch_page, page_numbers))
+    finally:
+        executor.shutdown(cancel_futures=True)
 
-    return review_data
+# --- Resume Checkpoint ---
+def load_checkpoint(filename):
+    """
+    Loads the state saved by a previous, interrupted run.
 
+    Returns:
+        dict: {'last_completed_page': int, 'review_count': int}, or None if there is no usable checkpoint.
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        logging.info(f"Resuming after page {checkpoint['last_completed_page']} with {checkpoint['review_count']} reviews already scraped.")
+        return checkpoint
+    except FileNotFoundError:
+        logging.info(f"No checkpoint found at '{filename}'. Starting from page 1.")
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Ignoring unreadable checkpoint '{filename}': {e}")
+    return None
+
+def save_checkpoint(filename, last_completed_page, review_count):
+    """
+    Saves the scrape state atomically: written to a temporary file, then renamed over the old checkpoint.
+    The seen review IDs are not stored here; on resume they are read back from the JSONL file.
+    """
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump({'last_completed_page': last_completed_page, 'review_count': review_count}, f)
+    os.replace(tmp_filename, filename)
 
 # --- Requests-based Extraction Function ---
-def extract_trustpilot_reviews(base_url, max_pages):
+def extract_trustpilot_reviews(base_url, max_pages, checkpoint_filename=None, resume_state=None, seen_review_ids=None):
     """
-    Extracts Turkish Airlines reviews from Trustpilot using requests and BeautifulSoup.
+    Extracts Turkish Airlines reviews from Trustpilot using requests and each page's embedded __NEXT_DATA__ JSON.
+
+    The first page to scrape (page 1, or the one after the resumed checkpoint) is fetched on its own to
+    learn the total page count; the remaining pages are then fetched
+    concurrently by FETCH_WORKERS threads and processed in page order. If the page count is
+    unknown, pages are fetched one by one until an empty page (or max_pages) is reached.
 
     Args:
         base_url (str): The base URL of the Trustpilot review page.
         max_pages (int): Maximum number of pages to scrape (0 for all).
+        checkpoint_filename (str): If given, the scrape state is saved there after every page.
+        resume_state (dict): A checkpoint from load_checkpoint(); scraping continues after its last completed page.
+        seen_review_ids (set): IDs of the reviews scraped by earlier runs, which are skipped. Updated in place.
 
-    Returns:
-        list: A list of review dictionaries (or an empty list on failure).
+    Yields:
+        tuple: (review_id, review_data) for each unique review as soon as its page is parsed,
+               so callers can stream it to disk.
     """
-    all_reviews_data = []
-    processed_review_ids = set()
-    current_page = 1
-    total_pages = 1 # Start assuming one page
-
-    while True:
-        page_url = f"{base_url}?page={current_page}"
-        logging.info(f"Requesting page: {page_url}")
-
+    processed_review_ids = seen_review_ids if seen_review_ids is not None else set()
+    first_page = resume_state['last_completed_page'] + 1 if resume_state else 1
+    # Only advanced over an unbroken run of pages, so a skipped page is fetched again on resume
+    last_completed_page = first_page - 1
+    # Reviews the caller has consumed over all runs; lets it drop a half-written page on resume
+    review_count = resume_state['review_count'] if resume_state else 0
+
+    def page_done(page_number, page_review_count):
+        """Records a page once all its reviews have been consumed by the caller."""
+        nonlocal last_completed_page, review_count
+        if page_number == last_completed_page + 1:
+            last_completed_page = page_number
+        review_count += page_review_count
+        if checkpoint_filename:
+            save_checkpoint(checkpoint_filename, last_completed_page, review_count)
+
+    def new_page_reviews(page_number, page_data):
+        """Returns the not yet seen reviews of one page, or None if the page had no reviews at all."""
+        reviews_on_page = page_data.get('props', {}).get('pageProps', {}).get('reviews', [])
+        if not reviews_on_page:
+            logging.info(f"No reviews found on page {page_number}. Assuming end of reviews.")
+            return None
+
+        new_reviews = []
+        for review_json in reviews_on_page:
+            review_id, review_data = parse_trustpilot_review_data(review_json)
+            if review_id in processed_review_ids:
+                continue
+            processed_review_ids.add(review_id)
+            new_reviews.append((review_id, review_data))
+
+        logging.info(f"Extracted {len(new_reviews)} new reviews from page {page_number}. Total unique reviews: {len(processed_review_ids)}")
+        return new_reviews
+
+    def _fetch_page(page_number):
+        return fetch_page_data(f"{base_url}?page={page_number}")
+
+    def fetched(page_data):
+        return page_data is not None and page_data is not TEMPORARY_FAILURE
+
+    page_data = _fetch_page(first_page)
+    new_reviews = new_page_reviews(first_page, page_data) if fetched(page_data) else None
+    if new_reviews is not None:
+        yield from new_reviews
+        page_done(first_page, len(new_reviews))
+        # Get total pages from the first page
         try:
-            response = requests.get(page_url, headers=HEADERS, timeout=20) # Added timeout
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed to fetch {page_url}: {e}")
-            break # Stop if a page fails to load
-
-        try:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            script_tag = soup.find('script', id='__NEXT_DATA__', type='application/json')
-
-            if not script_tag:
-                logging.warning(f"Could not find __NEXT_DATA__ script tag on page {current_page}. Stopping.")
-                break
+            total_pages = page_data['props']['pageProps']['filters']['pagination']['totalPages']
+            logging.info(f"Found {total_pages} total pages.")
+            if max_pages > 0:
+                 total_pages = min(total_pages, max_pages) # Respect max_pages limit
+                 logging.info(f"Will scrape up to {total_pages} pages based on limit.")
+        except (KeyError, TypeError):
+            total_pages = None
+            logging.warning("Could not determine total pages from page data. Scraping page by page until no new reviews are found or max_pages is hit.")
+
+        if total_pages is not None:
+            # All remaining page numbers are known now, so they are submitted as one batch
+            with closing(_gather_pages(_fetch_page, range(first_page + 1, total_pages + 1))) as pages:
+                failed_in_a_row = 0
+                for page_number, page_data in pages:
+                    if page_data is None:
+                        # Blocked or not a review page; the remaining pages would most likely fail the same way
+                        logging.error(f"Stopping at page {page_number} after failed fetch.")
+                        break
+                    if page_data is TEMPORARY_FAILURE:
+                        failed_in_a_row += 1
+                        if failed_in_a_row >= MAX_CONSECUTIVE_FAILED_PAGES:
+                            logging.error(f"Stopping at page {page_number} after {failed_in_a_row} failed pages in a row.")
+                            break
+                        # The later pages are known to exist, and --resume fetches this one again
+                        logging.warning(f"Skipping page {page_number} after failed fetch.")
+                        continue
+                    failed_in_a_row = 0
+                    new_reviews = new_page_reviews(page_number, page_data)
+                    if new_reviews is None:
+                        break # Stop at the first page that comes back empty
+                    yield from new_reviews
+                    page_done(page_number, len(new_reviews))
+                else:
+                    logging.info(f"Reached target page count ({total_pages}). Stopping.")
+        else:
+            # If totalPages isn't found, rely on max_pages or finding no reviews
+            last_page = max_pages or 1000 # Set a high arbitrary limit if not found and no user limit
+            for page_number in range(first_page + 1, last_page + 1):
+                page_data = _fetch_page(page_number)
+                new_reviews = new_page_reviews(page_number, page_data) if fetched(page_data) else None
+                if new_reviews is None:
+                    break
+                yield from new_reviews
+                page_done(page_number, len(new_reviews))
+
+# --- JSONL, CSV and Excel writing functions ---
+def truncate_reviews_jsonl(filename, keep_reviews):
+    """
+    Prepares a JSON Lines file for a resumed run: keeps the first keep_reviews reviews, which the
+    checkpoint covers, and drops anything after them (a page cut off mid-write).
 
-            page_data = json.loads(script_tag.string)
-            reviews_on_page = page_data.get('props', {}).get('pageProps', {}).get('reviews', [])
-
-            # Get total pages on the first iteration
-            if current_page == 1:
-                try:
-                    total_pages = page_data['props']['pageProps']['filters']['pagination']['totalPages']
-                    logging.info(f"Found {total_pages} total pages.")
-                    if max_pages > 0:
-                         total_pages = min(total_pages, max_pages) # Respect max_pages limit
-                         logging.info(f"Will scrape up to {total_pages} pages based on limit.")
-                except (KeyError, TypeError):
-                     logging.warning("Could not determine total pages from page data. Scraping page by page until no new reviews are found or max_pages is hit.")
-                     # If totalPages isn't found, rely on max_pages or finding no reviews
-                     if max_pages == 0: max_pages = 1000 # Set a high arbitrary limit if not found and no user limit
-
-            if not reviews_on_page:
-                logging.info(f"No reviews found on page {current_page}. Assuming end of reviews.")
+    Returns:
+        set: The review IDs of the kept reviews, so the resumed run skips them.
+    """
+    review_ids = set()
+    if not os.path.exists(filename):
+        return review_ids
+    with open(filename, 'r+b') as jsonl_file:
+        offset = 0
+        for _ in range(keep_reviews):
+            line = jsonl_file.readline()
+            if not line:
                 break
+            offset += len(line)
+            if line.strip():
+                review_ids.add(_json.loads(line).get('review_id'))
+        jsonl_file.truncate(offset)
+    return review_ids
 
-            new_reviews_found_on_page = 0
-            for review_json in reviews_on_page:
-                review_data = parse_trustpilot_review_data(review_json)
-                if review_data and review_data['id'] not in processed_review_ids:
-                    all_reviews_data.append(review_data)
-                    processed_review_ids.add(review_data['id'])
-                    new_reviews_found_on_page += 1
-
-            logging.info(f"Extracted {new_reviews_found_on_page} new reviews from page {current_page}. Total unique reviews: {len(all_reviews_data)}")
-
-            # Stop if we've reached the determined total pages or max_pages limit
-            if current_page >= total_pages:
-                 logging.info(f"Reached target page count ({total_pages}). Stopping.")
-                 break
-
-            current_page += 1
-            # Add a polite random delay between requests
-            time.sleep(random.uniform(1.0, 2.5))
-
-        except json.JSONDecodeError:
-            logging.error(f"Error decoding JSON data from __NEXT_DATA__ on page {current_page}.")
-            break # Stop if JSON is invalid
-        except Exception as e:
-            logging.error(f"An unexpected error occurred processing page {current_page}: {e}", exc_info=True)
-            break # Stop on unexpected errors
+def append_reviews_to_jsonl(reviews, filename, append=False):
+    """
+    Streams reviews to a JSON Lines file while they are being scraped, flushing after every review
+    so nothing that was scraped is lost if the run dies. Each record carries its review ID, which
+    is what a resumed run deduplicates against.
 
-    # Remove temporary ID before returning
-    for review in all_reviews_data:
-        review.pop('id', None) # Remove the Trustpilot internal ID if desired
-        review.pop('consumer_id', None) # Remove consumer ID if desired
+    Args:
+        reviews (iterable): (review_id, review_data) pairs, as yielded by extract_trustpilot_reviews().
+        append (bool): Append to the file (when resuming) instead of starting a new one.
 
-    return all_reviews_data
+    Returns:
+        int: The number of reviews written.
+    """
+    count = 0
+    with open(filename, 'a' if append else 'w', encoding='utf-8') as jsonl_file:
+        for review_id, review_data in reviews:
+            jsonl_file.write(json.dumps({'review_id': review_id, **review_data}, ensure_ascii=False) + '\n')
+            jsonl_file.flush()
+            count += 1
+    logging.info(f"Wrote {count} new reviews to {filename}")
+    return count
+
+def read_reviews_jsonl(filename):
+    """Generator: yields the reviews stored in a JSON Lines file, one at a time."""
+    with open(filename, 'r', encoding='utf-8') as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield _json.loads(line)
 
-# --- CSV and Excel writing functions (remain the same, ensure robustness) ---
 def write_reviews_to_csv(reviews, filename):
-    if not reviews:
-        logging.warning("No reviews provided to write_reviews_to_csv.")
-        return
-    fieldnames = set()
-    for review in reviews:
-        fieldnames.update(review.keys())
-    fieldnames = sorted(list(fieldnames))
+    """
+    Writes reviews to CSV one row at a time as the iterable produces them.
+    The file is not touched when there are no reviews, so an earlier run's output survives.
+
+    Returns:
+        int: The number of reviews written.
+    """
+    reviews = iter(reviews)
+    first_review = next(reviews, None)
+    if first_review is None:
+        logging.warning("No reviews provided to write_reviews_to_csv. Existing file left untouched.")
+        return 0
+    count = 0
+
+    def rows():
+        # Rows are emitted as tuples in REVIEW_FIELDS order, so csv.writer needs no per-field dict handling
+        nonlocal count
+        for review in chain((first_review,), reviews):
+            count += 1
+            yield tuple(review.get(field, '') for field in REVIEW_FIELDS)
 
     try:
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(reviews)
-        logging.info(f"Successfully wrote {len(reviews)} reviews to {filename}")
+            writer = csv.writer(csvfile)
+            writer.writerow(REVIEW_FIELDS)
+            writer.writerows(rows())
+        logging.info(f"Successfully wrote {count} reviews to {filename}")
     except Exception as e:
         logging.error(f"Error writing to CSV file '{filename}': {e}", exc_info=True)
+    return count
 
 def write_reviews_to_excel(reviews, filename):
-    if not reviews:
+    reviews = iter(reviews)
+    first_review = next(reviews, None)
+    if first_review is None:
         logging.warning("No reviews provided to write_reviews_to_excel.")
-        return
-    fieldnames = set()
-    for review in reviews:
-        fieldnames.update(review.keys())
-    fieldnames = sorted(list(fieldnames))
-
+        return 0
+    count = 0
     try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Reviews"
-        ws.append(fieldnames)
+        # Write-only mode serializes each row as it is appended instead of keeping every cell in memory
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Reviews")
+        ws.append(REVIEW_FIELDS)
 
-        for review in reviews:
-            row = [review.get(field, "") for field in fieldnames]
+        for review in chain((first_review,), reviews):
+            row = [review.get(field, "") for field in REVIEW_FIELDS]
             ws.append(row)
+            count += 1
 
         wb.save(filename)
-        logging.info(f"Successfully wrote {len(reviews)} reviews to {filename}")
+        logging.info(f"Successfully wrote {count} reviews to {filename}")
     except Exception as e:
        logging.error(f"Error writing to Excel file '{filename}': {e}", exc_info=True)
+    return count
 
 
 # --- Main Execution Block ---
@@ -220,6 +499,9 @@ if __name__ == "__main__":
     parser.add_argument("-p", "--pages", type=int, default=DEFAULT_MAX_PAGES, help="Maximum number of pages to scrape (0 for all).")
     parser.add_argument("-c", "--csv", default=DEFAULT_CSV_FILENAME, help="Output CSV filename.")
     parser.add_argument("-x", "--excel", default=DEFAULT_EXCEL_FILENAME, help="Output Excel filename.")
+    parser.add_argument("-j", "--jsonl", default=DEFAULT_JSONL_FILENAME, help="JSON Lines file every scraped review is appended to.")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_FILENAME, help="Checkpoint file recording the scrape progress.")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted scrape from the checkpoint, appending to the JSONL file.")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable DEBUG logging level.")
 
     args = parser.parse_args()
@@ -229,12 +511,22 @@ if __name__ == "__main__":
         logging.debug("DEBUG logging enabled.")
 
     logging.info("Starting Trustpilot review scraping process...")
-    extracted_reviews = extract_trustpilot_reviews(args.url, args.pages)
-
-    if extracted_reviews:
-        logging.info(f"Total unique reviews extracted: {len(extracted_reviews)}")
-        write_reviews_to_csv(extracted_reviews, args.csv)
-        write_reviews_to_excel(extracted_reviews, args.excel)
+    resume_state = load_checkpoint(args.checkpoint) if args.resume else None
+    if resume_state is None and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint) # A fresh run must not be resumed from an older run's progress
+    # On resume, the reviews already in the JSONL file are the ones to skip
+    seen_review_ids = truncate_reviews_jsonl(args.jsonl, resume_state['review_count']) if resume_state else set()
+    # Reviews are appended to the JSONL file as they are scraped, and the checkpoint is updated after every page
+    append_reviews_to_jsonl(extract_trustpilot_reviews(args.url, args.pages, args.checkpoint, resume_state, seen_review_ids),
+                            args.jsonl, append=resume_state is not None)
+
+    # The CSV and Excel files cover every review in the JSONL file, including those from resumed runs.
+    # Each export streams its own pass over the file, so the reviews are never held in memory.
+    review_count = write_reviews_to_csv(read_reviews_jsonl(args.jsonl), args.csv)
+
+    if review_count:
+        logging.info(f"Total unique reviews extracted: {review_count}")
+        write_reviews_to_excel(read_reviews_jsonl(args.jsonl), args.excel)
     else:
         logging.warning("No reviews were extracted or an error occurred.")
 